@@ -10,6 +10,7 @@ python3 -m venv ./venv
 # install dependencies
 pip install jira==3.0.1
 pip install psycopg2==2.8.4
+pip install numpy==1.21.6
 
 # initialize and create the database
 psql -f ./jiras/sql/create_db.sql
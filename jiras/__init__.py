@@ -1,16 +1,19 @@
 import os
 import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Sequence
 
 from jira import Issue
 
-from jiras.common.postgres import make_postgres
-from jiras.common.settings import Settings
+from jiras.common.postgres import PostgresException, make_postgres
+from jiras.common.settings import Settings, SourceSettings
+from jiras.etl.batch import parse_jira_issues
 from jiras.etl.extract import make_jira_client, JiraDataSource
-from jiras.etl.load import DataDestination
+from jiras.etl.load import DataDestination, validate_source_name
 from jiras.etl.transform import parse_jira_issue
-from jiras.etl.types import JiraIssue
+from jiras.etl.types import CustomFieldType, JiraIssue, PromotedField
+from jiras.etl.webhook import WebhookReceiver
 
 
 class JiraEtl:
@@ -18,20 +21,25 @@ class JiraEtl:
                  jira_query: str,
                  jira_query_limit: int,
                  pickle_filepath: str,
+                 vectorized_transform: bool = False,
+                 promoted_fields: Sequence[PromotedField] = (),
                  ):
         self.jira = source
         self.dest = dest
         self.jira_query = jira_query
         self.jira_query_limit = jira_query_limit
         self.pickle_filepath = pickle_filepath
+        self.vectorized_transform = vectorized_transform
+        self.promoted_fields = promoted_fields
         self.issues: List[JiraIssue] = []
 
     def reset(self):
         self._create_pickle_path_if_not_exists()
-        self.dest.reset_database()
+        self.dest.reset()
         print('Jiras reset completed')
 
     def extract(self):
+        self._create_pickle_path_if_not_exists()
         with open(self.pickle_filepath, 'wb') as f:
             jira_results = [i.raw for i in
                             self.jira.query(
@@ -43,25 +51,119 @@ class JiraEtl:
 
     def transform(self):
         with open(self.pickle_filepath, 'rb') as f:
-            self.issues = [
-                parse_jira_issue(Issue(options=None, session=None, raw=i))
-                for i in pickle.load(f)
-            ]
+            jira_issues = [Issue(options=None, session=None, raw=i) for i in pickle.load(f)]
+            if self.vectorized_transform:
+                self.issues = parse_jira_issues(jira_issues, self.promoted_fields)
+            else:
+                self.issues = [parse_jira_issue(i, self.promoted_fields) for i in jira_issues]
             print('Jiras transform completed')
 
-    def load(self):
-        self.dest.load(self.issues)
+    def load(self, replace: bool = False):
+        self.dest.load(self.issues, replace=replace)
         print('Jiras load completed')
 
     def _create_pickle_path_if_not_exists(self):
         Path(os.path.dirname(self.pickle_filepath)).mkdir(parents=True, exist_ok=True)
 
 
+def _make_promoted_fields(settings: Settings) -> List[PromotedField]:
+    return [
+        PromotedField(column=column, field_id=field_id, type=CustomFieldType(field_type))
+        for column, field_id, field_type in settings.promoted_custom_fields
+    ]
+
+
+def _make_data_destination(settings: Settings, source: str = '') -> DataDestination:
+    return DataDestination(
+        postgres=make_postgres(settings),
+        blocking_link_types=settings.blocking_link_types,
+        dependency_link_types=settings.dependency_link_types,
+        promoted_fields=_make_promoted_fields(settings),
+        source=source,
+    )
+
+
 def make_jira_etl(settings: Settings) -> JiraEtl:
     return JiraEtl(
         source=make_jira_client(settings),
-        dest=DataDestination(postgres=make_postgres(settings)),
+        dest=_make_data_destination(settings),
         jira_query=settings.jira_query,
         jira_query_limit=int(settings.jira_query_limit),
         pickle_filepath=settings.pickle_filepath,
+        vectorized_transform=settings.vectorized_transform,
+        promoted_fields=_make_promoted_fields(settings),
+    )
+
+
+def make_source_etl(settings: Settings, source: SourceSettings) -> JiraEtl:
+    return JiraEtl(
+        source=make_jira_client(source),
+        dest=_make_data_destination(settings, source=source.name),
+        jira_query=source.jira_query,
+        jira_query_limit=int(source.jira_query_limit),
+        pickle_filepath=os.path.join(os.path.dirname(settings.pickle_filepath), f'jiras_{source.name}.bin'),
+        vectorized_transform=settings.vectorized_transform,
+        promoted_fields=_make_promoted_fields(settings),
+    )
+
+
+def _refresh_source(settings: Settings, source: SourceSettings):
+    etl = make_source_etl(settings, source)
+    etl.extract()
+    etl.transform()
+    # the source's rows are replaced in the load transaction, no schema change runs alongside the other workers
+    etl.load(replace=True)
+
+
+def refresh_sources(settings: Settings, names: Optional[List[str]] = None) -> List[str]:
+    """
+    Refreshes the configured sources (or the named ones) concurrently, each into its own partitions
+    of the same database. Returns the names of the sources that failed.
+    """
+    # sources can't share the empty source of the single source runs, nor each other's partitions
+    for s in settings.sources:
+        validate_source_name(s.name)
+    configured = [s.name for s in settings.sources]
+    assert len(set(configured)) == len(configured), f'Duplicate source names: {", ".join(configured)}'
+    unknown = [n for n in names or [] if n not in configured]
+    assert not unknown, f'Unknown sources: {", ".join(unknown)}'
+
+    sources = [s for s in settings.sources if not names or s.name in names]
+    dest = _make_data_destination(settings)
+    if not dest.schema_exists():
+        dest.reset_database()
+    # schema changes on the tables shared by all sources run before the workers start
+    dest.add_promoted_fields()
+    for s in sources:
+        _make_data_destination(settings, source=s.name).create_source_partitions()
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=int(settings.source_workers)) as pool:
+        futures = {pool.submit(_refresh_source, settings, s): s.name for s in sources}
+        for f in as_completed(futures):
+            try:
+                f.result()
+                print(f'Jiras source {futures[f]} refreshed')
+            except (Exception, PostgresException) as error:
+                failed.append(futures[f])
+                print(f'Jiras source {futures[f]} failed - {error}')
+    return failed
+
+
+def find_source(settings: Settings, name: str) -> SourceSettings:
+    matches = [s for s in settings.sources if s.name == name]
+    assert matches, f'Unknown source: {name}'
+    return matches[0]
+
+
+def make_webhook_receiver(settings: Settings, source: Optional[JiraDataSource] = None) -> WebhookReceiver:
+    return WebhookReceiver(
+        # the issues go to the webhook source's partitions, next to the ones refreshed by jiras_sources.py
+        dest=_make_data_destination(settings, source=settings.webhook_source),
+        source=source,
+        jira_query=find_source(settings, settings.webhook_source).jira_query if settings.webhook_source else None,
+        promoted_fields=_make_promoted_fields(settings),
+        batch_size=int(settings.webhook_batch_size),
+        batch_wait_seconds=float(settings.webhook_batch_wait_seconds),
+        record_filepath=settings.webhook_record_filepath,
     )
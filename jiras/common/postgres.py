@@ -1,7 +1,9 @@
+import contextlib
 from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
 import psycopg2
+from psycopg2 import sql
 
 from jiras.common.settings import Settings
 
@@ -23,27 +25,67 @@ class Postgres:
         self.database = database
         self.username = username
         self.password = password
+        self._conn = None
+        self._in_transaction = False
+
+    def connect(self):
+        """Keeps a warm connection that the following exec calls reuse, until close."""
+        if self._conn is None or self._conn.closed:
+            self._conn = self._connect()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs the exec calls within as a single transaction, committed at the end or rolled back on error."""
+        if self._in_transaction:
+            yield
+            return
+        opened = self._conn is None or self._conn.closed
+        self.connect()
+        self._in_transaction = True
+        try:
+            yield
+            self._conn.commit()
+        except BaseException:
+            if not self._conn.closed:
+                self._conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+            if opened:
+                self.close()
+
+    def _connect(self):
+        return psycopg2.connect(
+            host=self.host,
+            port=self.port,
+            database=self.database,
+            user=self.username,
+            password=self.password,
+        )
 
     def exec(self,
-             query: str,
+             query: Union[str, sql.Composable],
              read_params: Optional[Dict] = None,
              write_params: Optional[List[Dict]] = None,
              ) -> Optional[QueryResult]:
         conn = None
         query_result: Optional[QueryResult] = None
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.username,
-                password=self.password,
-            )
+            if self._conn is not None and self._conn.closed:
+                self._conn = self._connect()
+            conn = self._conn or self._connect()
             cur = conn.cursor()
             if write_params:
                 for p in write_params:
                     cur.execute(query, p)
                 cur.close()
-                conn.commit()
+                if not self._in_transaction:
+                    conn.commit()
             else:
                 cur.execute(query, read_params)
                 query_result = QueryResult(
@@ -51,10 +93,14 @@ class Postgres:
                     columns=[desc[0] for desc in cur.description],
                 )
                 cur.close()
+                if conn is self._conn and not self._in_transaction:
+                    conn.rollback()  # ends the read transaction of the warm connection
         except (Exception, psycopg2.DatabaseError) as error:
+            if conn is not None and conn is self._conn and not conn.closed:
+                conn.rollback()
             raise PostgresException(error)
         finally:
-            if conn is not None:
+            if conn is not None and conn is not self._conn:
                 conn.close()
 
         return query_result
@@ -1,7 +1,7 @@
 import os
 import sys
 from dataclasses import dataclass
-from typing import Callable, Union
+from typing import Callable, Optional, Tuple, Union
 
 
 def _arg(index: int) -> str:
@@ -32,15 +32,33 @@ def from_arg(arg_index: int) -> DeferredString:
     return DeferredString(fn=_arg, key_or_arg=arg_index)
 
 
-def make_settings() -> 'Settings':
-    s = Settings()
-    for field in s.__dict__:
-        attr = getattr(s, field)
+def _resolve(obj, fields):
+    for field in fields:
+        attr = getattr(obj, field)
         if isinstance(attr, DeferredString):
-            setattr(s, field, attr.resolve())
+            setattr(obj, field, attr.resolve())
+
+
+def make_settings(*fields: str) -> 'Settings':
+    """Resolves the deferred settings, only the given fields if any. Sources are resolved only when given."""
+    s = Settings()
+    _resolve(s, fields or s.__dict__)
+    if 'sources' in fields:
+        for source in s.sources:
+            _resolve(source, source.__dict__)
     return s
 
 
+@dataclass
+class SourceSettings:
+    name: str  # tags and partitions the rows of this source, e.g. acme_web
+    jira_server: str
+    jira_query: str
+    jira_query_limit: int = 1000
+    jira_user: Union[str, DeferredString] = from_env('JIRA_USER')
+    jira_pass: Union[str, DeferredString] = from_env('JIRA_PASS')
+
+
 # -----------------------------------------------------------------
 # ------ Configure your runtime below ------------------------------
 
@@ -57,5 +75,25 @@ class Settings:
     jira_user: Union[str, DeferredString] = from_env('JIRA_USER')
     jira_pass: Union[str, DeferredString] = from_env('JIRA_PASS')
     pickle_filepath: str = './data/jiras.bin'
+    vectorized_transform: bool = False
+    blocking_link_types: Tuple[str, ...] = ('Blocks',)
+    dependency_link_types: Tuple[str, ...] = ('Dependency',)
+    # custom fields promoted to typed and indexed issue columns as (column, field id, numeric | date | text[]),
+    # e.g. (('story_points', 'customfield_10002', 'numeric'), ('sprint', 'customfield_10004', 'text[]'))
+    promoted_custom_fields: Tuple[Tuple[str, str, str], ...] = ()
+    webhook_host: str = '127.0.0.1'
+    webhook_port: int = 8765
+    webhook_batch_size: int = 100
+    webhook_batch_wait_seconds: float = 1.0
+    webhook_record_filepath: Optional[str] = None
+    # name of the source (in sources) the webhook events come from, or empty for the default source
+    webhook_source: str = ''
+    # shared with jira, sent as the X-Jiras-Webhook-Secret header or the secret query parameter
+    webhook_secret: Union[str, DeferredString] = from_env('JIRAS_WEBHOOK_SECRET')
+    # jira sources refreshed concurrently by jiras_sources.py into the same database, e.g.
+    # (SourceSettings(name='acme_web', jira_server='https://jira.acme.com', jira_query='project = WEB',
+    #                 jira_user=from_env('ACME_JIRA_USER'), jira_pass=from_env('ACME_JIRA_PASS')),)
+    sources: Tuple[SourceSettings, ...] = ()
+    source_workers: int = 4
 
 # -----------------------------------------------------------------
@@ -0,0 +1,284 @@
+import datetime
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from jiras.etl.transform import _make_jira_issue, _parse_issue_changelog
+from jiras.etl.types import Event, Field, JiraIssue, PromotedField, TimelineItem
+
+# A vectorized alternative to _parse_stats and _parse_timeline. The changelogs of
+# all issues in a batch are flattened into columnar arrays and the analytics are
+# computed for the whole batch at once. Results match the per-issue functions.
+
+_SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class _Dictionary:
+    """Dictionary-encodes values (including None) into dense integer codes."""
+
+    def __init__(self):
+        self._codes: Dict[Optional[str], int] = {}
+
+    @property
+    def values(self) -> List[Optional[str]]:
+        return list(self._codes)
+
+    def encode(self, value: Optional[str]) -> int:
+        return self._codes.setdefault(value, len(self._codes))
+
+    def encode_all(self, values: Iterable[Optional[str]], count: int) -> np.ndarray:
+        codes = self._codes
+        return np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int64, count=count)
+
+    def truthy(self) -> np.ndarray:
+        return np.array([bool(v) for v in self.values], dtype=bool)
+
+
+@dataclass
+class EventBatch:
+    num_issues: int
+    issue: np.ndarray  # int64, index of the issue each event belongs to
+    field: np.ndarray  # int64, Field value
+    created: np.ndarray  # int64, seconds since epoch
+    status: np.ndarray  # int64, code into statuses
+    assignee: np.ndarray  # int64, code into assignees
+    label: np.ndarray  # int64, code into labels (the timeline status entry of the event)
+    statuses: _Dictionary
+    assignees: _Dictionary
+    labels: _Dictionary
+
+
+def _to_seconds(d: datetime.datetime) -> int:
+    # cheaper than converting datetime objects through numpy, sub-second precision is dropped
+    return (d.toordinal() - _EPOCH_ORDINAL) * _SECONDS_PER_DAY + d.hour * 3600 + d.minute * 60 + d.second
+
+
+def _flatten(logs: List[List[Event]]) -> EventBatch:
+    statuses = _Dictionary()
+    assignees = _Dictionary()
+    resolutions = _Dictionary()
+    labels = _Dictionary()
+
+    events = [e for log in logs for e in log]
+    n = len(events)
+    issue = np.repeat(np.arange(len(logs), dtype=np.int64), [len(log) for log in logs])
+    field = np.fromiter((e.field.value for e in events), dtype=np.int64, count=n)
+    created = np.fromiter((_to_seconds(e.created) for e in events), dtype=np.int64, count=n)
+    status = statuses.encode_all((e.status for e in events), n)
+    assignee = assignees.encode_all((e.assignee for e in events), n)
+    resolution = resolutions.encode_all((e.resolution for e in events), n)
+
+    # the label is what _parse_timeline appends to the status list of the day for the event
+    created_label = labels.encode_all((f'Created<{log[0].reporter}>' for log in logs), len(logs))
+    status_label = labels.encode_all(statuses.values, len(statuses.values))
+    resolution_label = labels.encode_all(
+        (f'Resolved<{r}>' if r else 'Resolved' for r in resolutions.values),
+        len(resolutions.values),
+    )
+    label = np.where(
+        field == Field.Created.value,
+        created_label[issue],
+        np.where(field == Field.Status.value, status_label[status], resolution_label[resolution]),
+    )
+
+    return EventBatch(
+        num_issues=len(logs),
+        issue=issue,
+        field=field,
+        created=created,
+        status=status,
+        assignee=assignee,
+        label=label,
+        statuses=statuses,
+        assignees=assignees,
+        labels=labels,
+    )
+
+
+def _diff_days(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    days, seconds = np.divmod(t1 - t2, _SECONDS_PER_DAY)
+    diff = days + seconds / 3600.0 / 24.0
+    # removing the weekend days from the total
+    diff = diff - _num_weekend_days(t1, t2)
+    return np.where(diff > 0.01, diff, 0.0)
+
+
+def _num_weekend_days(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    # same semantics as transform._num_weekend_days: weekend days in [date(t1), date(t2)]
+    d1 = (t1 // _SECONDS_PER_DAY).astype('datetime64[D]')
+    d2 = (t2 // _SECONDS_PER_DAY).astype('datetime64[D]')
+    ordered = d1 <= d2
+    end = np.where(ordered, d2, d1) + np.timedelta64(1, 'D')
+    total = (end - d1).astype(np.int64)
+    return np.where(ordered, total - np.busday_count(d1, end), 0)
+
+
+def _is_last_in_issue(issue: np.ndarray) -> np.ndarray:
+    is_last = np.ones(len(issue), dtype=bool)
+    is_last[:-1] = issue[:-1] != issue[1:]
+    return is_last
+
+
+def _assignee_changes(batch: EventBatch) -> np.ndarray:
+    # unassigning (assignee None) is not a change of assignee for stats and timeline purposes
+    return (batch.field == Field.Assignee.value) & (batch.assignee != batch.assignees.encode(None))
+
+
+def _interval_days(issue: np.ndarray, created: np.ndarray, now: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Days from each event to the next one of the same issue (or now, for the last one)."""
+    is_last = _is_last_in_issue(issue)
+    end = np.empty_like(created)
+    end[:-1] = created[1:]
+    end[is_last] = now
+    return _diff_days(end, created), is_last
+
+
+def _sum_by_issue(issue: np.ndarray,
+                  code: np.ndarray,
+                  days: np.ndarray,
+                  values: List[Optional[str]],
+                  result: List[Dict],
+                  ):
+    if not len(issue):
+        return
+    # groups are numbered in order of first occurrence so the dicts keep the per-issue ordering
+    keys = issue * len(values) + code
+    _, first, group = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    group = rank[group.ravel()]
+    # bincount accumulates sequentially, matching the += of the per-issue loop
+    sums = np.bincount(group, weights=days, minlength=len(order))
+
+    for g, i, c in zip(range(len(order)), issue[first[order]].tolist(), code[first[order]].tolist()):
+        result[i][values[c]] = float(sums[g])
+
+
+def parse_batch_stats(logs: List[List[Event]],
+                      now: Optional[datetime.datetime] = None,
+                      ) -> List[Tuple[Dict[str, float], Dict[str, float]]]:
+    batch = _flatten(logs)
+    return _parse_batch_stats(batch, _to_seconds(now or datetime.datetime.now()))
+
+
+def _parse_batch_stats(batch: EventBatch, now: int) -> List[Tuple[Dict, Dict]]:
+    time_in_status: List[Dict] = [{} for _ in range(batch.num_issues)]
+    time_per_assignee: List[Dict] = [{} for _ in range(batch.num_issues)]
+
+    # status: only the first occurrence of each status per issue counts
+    status_mask = batch.field == Field.Status.value
+    issue = batch.issue[status_mask]
+    code = batch.status[status_mask]
+    created = batch.created[status_mask]
+    if len(issue):
+        _, first = np.unique(issue * len(batch.statuses.values) + code, return_index=True)
+        first.sort()
+        issue, code, created = issue[first], code[first], created[first]
+        days, is_last = _interval_days(issue, created, now)
+        days = np.where(is_last | batch.statuses.truthy()[code], days, 0.0)
+        _sum_by_issue(issue, code, days, batch.statuses.values, time_in_status)
+
+    # assignee: every change counts, time accumulates across reassignments
+    assignee_mask = _assignee_changes(batch)
+    issue = batch.issue[assignee_mask]
+    code = batch.assignee[assignee_mask]
+    created = batch.created[assignee_mask]
+    if len(issue):
+        days, is_last = _interval_days(issue, created, now)
+        days = np.where(is_last | batch.assignees.truthy()[code], days, 0.0)
+        _sum_by_issue(issue, code, days, batch.assignees.values, time_per_assignee)
+
+    return list(zip(time_in_status, time_per_assignee))
+
+
+def parse_batch_timelines(logs: List[List[Event]]) -> List[Dict[datetime.date, TimelineItem]]:
+    return _parse_batch_timelines(_flatten(logs))
+
+
+def _forward_fill(has_value: np.ndarray, day_start: np.ndarray) -> np.ndarray:
+    """Index of the latest day (within the same issue) with a value, or -1."""
+    index = np.where(has_value, np.arange(len(has_value)), -1)
+    filled = np.maximum.accumulate(index) if len(index) else index
+    return np.where(filled >= day_start, filled, -1)
+
+
+def _fill_values(day: np.ndarray, code: np.ndarray, day_start: np.ndarray, truthy: np.ndarray) -> np.ndarray:
+    """Code to carry into each day from the latest non-empty day before it, or -1."""
+    num_days = len(day_start)
+    has_value = np.bincount(day, minlength=num_days) > 0
+    last = np.full(num_days, -1, dtype=np.int64)
+    last[day] = code  # with repeated indices the last assignment wins
+    source = _forward_fill(has_value, day_start)
+    value = np.where(source >= 0, last[source], -1)
+    return np.where((value >= 0) & truthy[value], value, -1)
+
+
+def _day_lists(day: np.ndarray, code: np.ndarray, fill: np.ndarray, values: List[Optional[str]]) -> List[List]:
+    bounds = np.searchsorted(day, np.arange(len(fill) + 1)).tolist()
+    day_values = [values[c] for c in code.tolist()]
+    lists = [day_values[s:e] for s, e in zip(bounds[:-1], bounds[1:])]
+    empty = np.bincount(day, minlength=len(fill)) == 0
+    for d, c in zip(np.flatnonzero(empty & (fill >= 0)).tolist(), fill[empty & (fill >= 0)].tolist()):
+        lists[d] = [values[c]]
+    return lists
+
+
+def _parse_batch_timelines(batch: EventBatch) -> List[Dict[datetime.date, TimelineItem]]:
+    if not batch.num_issues:
+        return []
+
+    # timeline spans from the date of the first to the date of the last event of each issue
+    event_day = batch.created // _SECONDS_PER_DAY
+    is_last = _is_last_in_issue(batch.issue)
+    is_first = np.roll(is_last, 1)
+    first_day = event_day[is_first]
+    last_day = event_day[is_last]
+    issue_num_days = last_day - first_day + 1
+    issue_start = np.concatenate(([0], np.cumsum(issue_num_days)[:-1]))
+    num_days = int(issue_num_days.sum())
+
+    day_issue = np.repeat(np.arange(batch.num_issues), issue_num_days)
+    day_start = issue_start[day_issue]
+    day_date = first_day[day_issue] + np.arange(num_days) - day_start
+    day = issue_start[batch.issue] + event_day - first_day[batch.issue]
+
+    assignee_mask = _assignee_changes(batch)
+    status_mask = ~assignee_mask
+
+    # events grouped per day, keeping their original order within the day
+    status_order = np.argsort(day[status_mask], kind='stable')
+    status_day = day[status_mask][status_order]
+    status_code = batch.label[status_mask][status_order]
+    assignee_order = np.argsort(day[assignee_mask], kind='stable')
+    assignee_day = day[assignee_mask][assignee_order]
+    assignee_code = batch.assignee[assignee_mask][assignee_order]
+
+    # empty days take the last value of the latest non-empty day, unless it's falsy
+    fill_status = _fill_values(status_day, status_code, day_start, batch.labels.truthy())
+    fill_assignee = _fill_values(assignee_day, assignee_code, day_start, batch.assignees.truthy())
+
+    statuses = _day_lists(status_day, status_code, fill_status, batch.labels.values)
+    assignees = _day_lists(assignee_day, assignee_code, fill_assignee, batch.assignees.values)
+    items = list(map(TimelineItem, statuses, assignees))
+    dates = day_date.astype('datetime64[D]').tolist()
+
+    bounds = np.append(issue_start, num_days).tolist()
+    timelines = [dict(zip(dates[s:e], items[s:e])) for s, e in zip(bounds[:-1], bounds[1:])]
+    return timelines
+
+
+def parse_jira_issues(issues: List[Any],
+                      promoted_fields: Sequence[PromotedField] = (),
+                      now: Optional[datetime.datetime] = None,
+                      ) -> List[JiraIssue]:
+    logs = [_parse_issue_changelog(i) for i in issues]
+    batch = _flatten(logs)
+    stats = _parse_batch_stats(batch, _to_seconds(now or datetime.datetime.now()))
+    timelines = _parse_batch_timelines(batch)
+    return [
+        _make_jira_issue(issue, log, time_in_status, time_per_assignee, timeline, promoted_fields)
+        for issue, log, (time_in_status, time_per_assignee), timeline in zip(issues, logs, stats, timelines)
+    ]
@@ -1,12 +1,12 @@
 import math
-from typing import Any, List
+from typing import Any, List, Union
 
 from jira import JIRA
 
-from jiras.common.settings import Settings
+from jiras.common.settings import Settings, SourceSettings
 
 
-def make_jira_client(settings: Settings):
+def make_jira_client(settings: Union[Settings, SourceSettings]):
     return JiraDataSource(
         j=JIRA(
             settings.jira_server,
@@ -19,7 +19,7 @@ class JiraDataSource:
     def __init__(self, j: JIRA):
         self._j = j
 
-    def query(self, jql: str, limit: int = 100, page_size: int = 100) -> List[Any]:
+    def query(self, jql: str, limit: int = 100, page_size: int = 100, validate_query: bool = True) -> List[Any]:
         all_results = []
 
         page_index = 0
@@ -38,6 +38,7 @@ class JiraDataSource:
                 maxResults=max_results,
                 startAt=start_at,
                 expand='changelog',
+                validate_query=validate_query,
             )
 
             if not page_results:
@@ -1,12 +1,22 @@
 import pathlib
 import json
-from typing import List
+import re
+from typing import Dict, List, Optional, Sequence
+
+from psycopg2 import sql
 
 from jiras.common.postgres import Postgres
-from jiras.etl.types import JiraIssue
+from jiras.etl.types import CustomFieldType, JiraIssue, PromotedField
+
+_COLUMN_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# promoted columns are indexed as ix_issue_{column}, longer names would be truncated by postgres
+_MAX_PROMOTED_COLUMN_LENGTH = 63 - len('ix_issue_')
+_PROMOTED_FIELD_COMMENT = 'Promoted custom field '
 
 _SQL_INSERT_ISSUE = '''
 insert into issue (
+    source,
     key,
     project,
     "type",
@@ -27,8 +37,10 @@ insert into issue (
     labels,
     links,
     components,
-    custom_fields
+    custom_fields,
+    search_vector{promoted_columns}
 ) values (
+    %(source)s,
     %(key)s,
     %(project)s,
     %(type)s,
@@ -49,12 +61,73 @@ insert into issue (
     %(labels)s,
     %(links)s,
     %(components)s,
-    %(custom_fields)s
+    %(custom_fields)s,
+    setweight(to_tsvector('english', coalesce(%(summary)s, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(%(description)s, '')), 'B') ||
+    setweight(to_tsvector('english', array_to_string(%(labels)s::varchar[] || %(components)s::varchar[], ' ')), 'C'){promoted_values}
 )
+on conflict (source, key) do update set
+    ingested_at = excluded.ingested_at,
+    project = excluded.project,
+    "type" = excluded."type",
+    status = excluded.status,
+    created = excluded.created,
+    creator = excluded.creator,
+    creator_id = excluded.creator_id,
+    reporter = excluded.reporter,
+    reporter_id = excluded.reporter_id,
+    summary = excluded.summary,
+    assignee = excluded.assignee,
+    assignee_id = excluded.assignee_id,
+    updated = excluded.updated,
+    resolved = excluded.resolved,
+    resolution = excluded.resolution,
+    due_date = excluded.due_date,
+    description = excluded.description,
+    labels = excluded.labels,
+    links = excluded.links,
+    components = excluded.components,
+    custom_fields = excluded.custom_fields,
+    search_vector = excluded.search_vector{promoted_updates}
+'''
+
+# derived rows are replaced as a whole when an issue is reloaded
+_SQL_DELETE_DERIVED = '''
+delete from event_log where source = %(source)s and issue_key = any(%(keys)s::varchar[]);
+delete from time_in_status where source = %(source)s and issue_key = any(%(keys)s::varchar[]);
+delete from time_per_assignee where source = %(source)s and issue_key = any(%(keys)s::varchar[]);
+delete from timeline where source = %(source)s and issue_key = any(%(keys)s::varchar[])
+'''
+
+_SQL_DELETE_ISSUE = '''
+delete from issue where source = %(source)s and key = any(%(keys)s::varchar[])
+'''
+
+_SQL_ISSUE_COLUMNS = '''
+select column_name, col_description('issue'::regclass, ordinal_position)
+from information_schema.columns
+where table_schema = current_schema() and table_name = 'issue'
+'''
+
+_SQL_ADD_PROMOTED_FIELD = '''
+alter table issue add column if not exists {column} {type}
+'''
+
+_SQL_COMMENT_PROMOTED_FIELD = '''
+comment on column issue.{column} is %(comment)s
+'''
+
+_SQL_INDEX_EXISTS = '''
+select to_regclass(%(index)s) is not null as index_exists
+'''
+
+_SQL_INDEX_PROMOTED_FIELD = '''
+create index if not exists {index} on issue using {method} ({column})
 '''
 
 _SQL_INSERT_EVENT_LOG = '''
 insert into event_log (
+    source,
     issue_key,
     field,
     reporter,
@@ -65,6 +138,7 @@ insert into event_log (
     status,
     resolution
 ) values (
+    %(source)s,
     %(issue_key)s,
     %(field)s,
     %(reporter)s,
@@ -79,10 +153,12 @@ insert into event_log (
 
 _SQL_INSERT_TIME_IN_STATUS = '''
 insert into time_in_status (
+    source,
     issue_key,
     status,
     days
 ) values (
+    %(source)s,
     %(issue_key)s,
     %(status)s,
     %(days)s
@@ -91,10 +167,12 @@ insert into time_in_status (
 
 _SQL_INSERT_TIME_PER_ASSIGNEE = '''
 insert into time_per_assignee (
+    source,
     issue_key,
     assignee,
     days
 ) values (
+    %(source)s,
     %(issue_key)s,
     %(assignee)s,
     %(days)s
@@ -103,11 +181,13 @@ insert into time_per_assignee (
 
 _SQL_INSERT_TIMELINE = '''
 insert into timeline (
+    source,
     issue_key,
     d,
     status,
     assignee
 ) values (
+    %(source)s,
     %(issue_key)s,
     %(d)s,
     %(status)s,
@@ -115,12 +195,140 @@ insert into timeline (
 )
 '''
 
+# Replaces the links of the loaded issues and refreshes the dependency closure incrementally.
+# Only the closure rows of issues that can reach a loaded issue, or an issue linked to it
+# before or after the load, can change. Those rows are dropped and recomputed from the
+# blocker -> blocked edges of the blocking and dependency link types. The links of other
+# issues to deleted ones are dropped too.
+_SQL_LOAD_ISSUE_LINKS = '''
+create temp table dependency_refresh on commit drop as
+select unnest(%(keys)s::varchar[]) as key
+union
+select linked_key from issue_link where source = %(source)s and issue_key = any(%(keys)s::varchar[])
+union
+select issue_key from issue_link where source = %(source)s and linked_key = any(%(deleted_keys)s::varchar[])
+union
+select unnest(%(linked_keys)s::varchar[]);
+
+insert into dependency_refresh
+select distinct d.ancestor
+from issue_dependency d
+join dependency_refresh r on r.key = d.descendant
+where d.source = %(source)s;
+
+delete from issue_link
+where source = %(source)s
+  and (issue_key = any(%(keys)s::varchar[]) or linked_key = any(%(deleted_keys)s::varchar[]));
+
+insert into issue_link (source, issue_key, linked_key, type, direction)
+select %(source)s, * from unnest(
+    %(issue_keys)s::varchar[],
+    %(linked_keys)s::varchar[],
+    %(types)s::varchar[],
+    %(directions)s::varchar[]
+);
+
+delete from issue_dependency where source = %(source)s and ancestor in (select key from dependency_refresh);
+
+insert into issue_dependency (source, ancestor, descendant)
+with recursive dependency_edge (blocker, blocked) as (
+    select
+        case when (direction = 'Outward') = (type = any(%(blocking_link_types)s::varchar[]))
+            then issue_key else linked_key end,
+        case when (direction = 'Outward') = (type = any(%(blocking_link_types)s::varchar[]))
+            then linked_key else issue_key end
+    from issue_link
+    where source = %(source)s
+      and (type = any(%(blocking_link_types)s::varchar[]) or type = any(%(dependency_link_types)s::varchar[]))
+), closure (ancestor, descendant) as (
+    select blocker, blocked
+    from dependency_edge
+    where blocker in (select key from dependency_refresh)
+    union
+    select c.ancestor, e.blocked
+    from closure c
+    join dependency_edge e on e.blocker = c.descendant
+)
+select %(source)s, ancestor, descendant from closure
+'''
+
+_PARTITIONED_TABLES = [
+    # referencing tables first, the rows of a source are cleared in this order
+    'issue_dependency',
+    'issue_link',
+    'timeline',
+    'time_per_assignee',
+    'time_in_status',
+    'event_log',
+    'issue',
+]
+
+_SQL_CREATE_PARTITION = '''
+create table if not exists {partition} partition of {table} for values in (%(source)s)
+'''
+
+# postgres can't truncate a partition referenced by a partitioned table's foreign key without
+# truncating the whole referencing table, deleting only locks the rows of this source instead
+_SQL_CLEAR_SOURCE = '''
+delete from {table} where source = %(source)s
+'''
+
+_SQL_SCHEMA_EXISTS = '''
+select to_regclass('issue') is not null as schema_exists
+'''
+
+# partitions are named {table}__{source}, postgres truncates identifiers longer than 63 characters
+_MAX_SOURCE_NAME_LENGTH = 63 - len(f'{max(_PARTITIONED_TABLES, key=len)}__')
+
+
+def validate_source_name(source: str):
+    assert source, 'A source name is required'
+    assert _COLUMN_NAME.match(source), f'Invalid source name {source}'
+    assert len(source) <= _MAX_SOURCE_NAME_LENGTH, \
+        f'Source name {source} is longer than {_MAX_SOURCE_NAME_LENGTH} characters'
+
 
 class DataDestination:
-    def __init__(self, postgres: Postgres):
+    def __init__(self, postgres: Postgres,
+                 blocking_link_types: Sequence[str] = ('Blocks',),
+                 dependency_link_types: Sequence[str] = ('Dependency',),
+                 promoted_fields: Sequence[PromotedField] = (),
+                 source: str = '',
+                 ):
+        for p in promoted_fields:
+            assert _COLUMN_NAME.match(p.column), f'Invalid column name {p.column} for {p.field_id}'
+            assert len(p.column) <= _MAX_PROMOTED_COLUMN_LENGTH, \
+                f'Column name {p.column} for {p.field_id} is longer than {_MAX_PROMOTED_COLUMN_LENGTH} characters'
+        assert len({p.column for p in promoted_fields}) == len(promoted_fields), 'Duplicate promoted column names'
+        if source:
+            validate_source_name(source)
         self.postgres = postgres
+        # tags every row, each source is loaded into its own partitions (the default ones when empty)
+        self.source = source
+        # link types whose outward issue is blocked by the linking issue (e.g. "blocks")
+        self.blocking_link_types = list(blocking_link_types)
+        # link types whose outward issue blocks the linking issue (e.g. "depends on")
+        self.dependency_link_types = list(dependency_link_types)
+        self.promoted_fields = list(promoted_fields)
+        # identifiers are quoted, the values use their own placeholders to not clash with the issue ones
+        self._sql_insert_issue = sql.SQL(_SQL_INSERT_ISSUE).format(
+            promoted_columns=sql.SQL('').join(
+                sql.SQL(',\n    {}').format(sql.Identifier(p.column)) for p in self.promoted_fields
+            ),
+            promoted_values=sql.SQL('').join(
+                sql.SQL(',\n    {}').format(sql.Placeholder(f'promoted_{n}')) for n in range(len(self.promoted_fields))
+            ),
+            promoted_updates=sql.SQL('').join(
+                sql.SQL(',\n    {column} = excluded.{column}').format(column=sql.Identifier(p.column))
+                for p in self.promoted_fields
+            ),
+        )
 
     def reset_database(self):
+        if self.schema_exists():
+            # fails before dropping anything
+            self._check_promoted_fields()
+
         create_schema_filepath = f'{pathlib.Path().absolute()}/jiras/sql/create_schema.sql'
         with open(create_schema_filepath, 'rt', encoding='utf-8') as f:
             statements = ''.join(f.readlines()).split(';')
@@ -128,15 +336,94 @@ class DataDestination:
             for stmt in [s for s in statements if s]:
                 self.postgres.exec(query=stmt, write_params=[{}])
 
-    def load(self, issues: List[JiraIssue]):
+        self.create_source_partitions()
+        self.add_promoted_fields()
+
+    def add_promoted_fields(self):
+        """Adds the promoted columns missing from the issue table, with their indexes."""
+        # only the missing ones, altering the table waits for every running load
+        columns = self._check_promoted_fields()
+        for p in self.promoted_fields:
+            column = sql.Identifier(p.column)
+            if p.column not in columns:
+                self.postgres.exec(
+                    query=sql.SQL(_SQL_ADD_PROMOTED_FIELD).format(column=column, type=sql.SQL(p.type.value)),
+                    write_params=[{}],
+                )
+                self.postgres.exec(
+                    query=sql.SQL(_SQL_COMMENT_PROMOTED_FIELD).format(column=column),
+                    write_params=[{'comment': f'{_PROMOTED_FIELD_COMMENT}{p.field_id}'}],
+                )
+            index = f'ix_issue_{p.column}'
+            if not self.postgres.exec(_SQL_INDEX_EXISTS, read_params={'index': index}).result_set[0][0]:
+                self.postgres.exec(
+                    query=sql.SQL(_SQL_INDEX_PROMOTED_FIELD).format(
+                        index=sql.Identifier(index),
+                        method=sql.SQL('gin' if p.type == CustomFieldType.TextArray else 'btree'),
+                        column=column,
+                    ),
+                    write_params=[{}],
+                )
+
+    def _check_promoted_fields(self) -> Dict[str, Optional[str]]:
+        # promoted columns are told apart from the issue schema ones by their comment
+        columns = dict(self.postgres.exec(_SQL_ISSUE_COLUMNS).result_set)
+        for p in self.promoted_fields:
+            comment = columns.get(p.column, _PROMOTED_FIELD_COMMENT) or ''
+            assert comment.startswith(_PROMOTED_FIELD_COMMENT), \
+                f'Column name {p.column} for {p.field_id} is already an issue column'
+        return columns
+
+    def schema_exists(self) -> bool:
+        return self.postgres.exec(_SQL_SCHEMA_EXISTS).result_set[0][0]
+
+    def reset(self):
+        """Resets the whole database for the default source, otherwise only clears the rows of this source."""
+        if not self.source:
+            self.reset_database()
+            return
+
+        self.create_source_partitions()
+        with self.postgres.transaction():
+            self._clear_source()
+
+    def create_source_partitions(self):
+        if not self.source:
+            return
+        for table in reversed(_PARTITIONED_TABLES):
+            self.postgres.exec(
+                _SQL_CREATE_PARTITION.format(table=table, partition=self._partition(table)),
+                write_params=[{'source': self.source}],
+            )
+
+    def _partition(self, table: str) -> str:
+        return f'{table}__{self.source}'
+
+    def _clear_source(self):
+        for table in _PARTITIONED_TABLES:
+            self.postgres.exec(_SQL_CLEAR_SOURCE.format(table=table), write_params=[{'source': self.source}])
+
+    def load(self, issues: List[JiraIssue], replace: bool = False):
+        """
+        Loads the issues, replacing the ones already loaded and their derived rows. With replace, all the
+        issues of the source are replaced, in the same transaction.
+        """
+        if not issues:
+            if replace:
+                with self.postgres.transaction():
+                    self._clear_source()
+            return
+
         issue_write_params = []
         event_log_write_params = []
         time_in_status_write_params = []
         time_per_assignee_write_params = []
         timeline_write_params = []
+        link_write_params = self._link_params(keys=[])
 
         for i in issues:
             issue_write_params.append({
+                'source': self.source,
                 'key': i.key,
                 'project': i.project,
                 'type': i.type,
@@ -158,9 +445,11 @@ class DataDestination:
                 'links': json.dumps(i.links),
                 'components': [c.name for c in i.components],
                 'custom_fields': json.dumps(i.custom_fields),
+                **{f'promoted_{n}': i.promoted_fields.get(p.column) for n, p in enumerate(self.promoted_fields)},
             })
 
             event_log_write_params.extend([{
+                'source': self.source,
                 'issue_key': i.key,
                 'field': e.field.name,
                 'reporter': e.reporter,
@@ -173,26 +462,70 @@ class DataDestination:
             } for e in i.event_log])
 
             time_in_status_write_params.extend([{
+                'source': self.source,
                 'issue_key': i.key,
                 'status': k,
                 'days': v,
             } for k, v in i.time_in_status.items()])
 
             time_per_assignee_write_params.extend([{
+                'source': self.source,
                 'issue_key': i.key,
                 'assignee': k,
                 'days': v,
             } for k, v in i.time_per_assignee.items()])
 
             timeline_write_params.extend([{
+                'source': self.source,
                 'issue_key': i.key,
                 'd': k,
                 'status': v.status,
                 'assignee': v.assignee,
             } for k, v in i.timeline.items()])
 
-        self.postgres.exec(_SQL_INSERT_ISSUE, write_params=issue_write_params)
-        self.postgres.exec(_SQL_INSERT_EVENT_LOG, write_params=event_log_write_params)
-        self.postgres.exec(_SQL_INSERT_TIME_IN_STATUS, write_params=time_in_status_write_params)
-        self.postgres.exec(_SQL_INSERT_TIME_PER_ASSIGNEE, write_params=time_per_assignee_write_params)
-        self.postgres.exec(_SQL_INSERT_TIMELINE, write_params=timeline_write_params)
+            link_write_params['keys'].append(i.key)
+            for l in i.link_edges:
+                link_write_params['issue_keys'].append(i.key)
+                link_write_params['linked_keys'].append(l.key)
+                link_write_params['types'].append(l.type)
+                link_write_params['directions'].append(l.direction.name)
+
+        # a failure halfway must not leave reloaded issues without their derived rows
+        with self.postgres.transaction():
+            if replace:
+                self._clear_source()
+            self.postgres.exec(self._sql_insert_issue, write_params=issue_write_params)
+            self.postgres.exec(_SQL_DELETE_DERIVED, write_params=[{'source': self.source, 'keys': link_write_params['keys']}])
+            self._write(_SQL_INSERT_EVENT_LOG, event_log_write_params)
+            self._write(_SQL_INSERT_TIME_IN_STATUS, time_in_status_write_params)
+            self._write(_SQL_INSERT_TIME_PER_ASSIGNEE, time_per_assignee_write_params)
+            self._write(_SQL_INSERT_TIMELINE, timeline_write_params)
+            self.postgres.exec(_SQL_LOAD_ISSUE_LINKS, write_params=[link_write_params])
+
+    def delete(self, keys: List[str]):
+        """Deletes the issues with their derived rows and links."""
+        if not keys:
+            return
+
+        with self.postgres.transaction():
+            self.postgres.exec(_SQL_DELETE_DERIVED, write_params=[{'source': self.source, 'keys': keys}])
+            self.postgres.exec(_SQL_LOAD_ISSUE_LINKS, write_params=[{**self._link_params(keys=keys), 'deleted_keys': keys}])
+            self.postgres.exec(_SQL_DELETE_ISSUE, write_params=[{'source': self.source, 'keys': keys}])
+
+    def _link_params(self, keys: List[str]) -> Dict:
+        return {
+            'source': self.source,
+            'keys': keys,
+            'deleted_keys': [],
+            'issue_keys': [],
+            'linked_keys': [],
+            'types': [],
+            'directions': [],
+            'blocking_link_types': self.blocking_link_types,
+            'dependency_link_types': self.dependency_link_types,
+        }
+
+    def _write(self, query: str, write_params: List[Dict]):
+        # exec treats empty write params as a read
+        if write_params:
+            self.postgres.exec(query, write_params=write_params)
@@ -1,12 +1,18 @@
 import collections
 import datetime
-from typing import List, Optional, Dict, Any, Tuple
+import math
+import re
+from typing import List, Optional, Dict, Any, Tuple, Sequence
 
-from jiras.etl.types import Event, Field, JiraIssue, TimelineItem
+from jiras.etl.types import (
+    CustomFieldType, Event, Field, IssueLink, JiraIssue, LinkDirection, PromotedField, TimelineItem,
+)
 
 _STATUS = 'status'
 _ASSIGNEE = 'assignee'
 _VAL_RESOLUTION = 'resolution'
+# jira server serializes sprints as com.atlassian.greenhopper.service.sprint.Sprint@1a2b[id=1,...,name=Sprint 1,...]
+_SPRINT_NAME = re.compile(r'\[.*?\bname=([^,\]]*)')
 
 
 def _parse_datetime(value: str) -> datetime.datetime:
@@ -64,6 +70,15 @@ def _parse_issue_changelog(issue) -> List[Event]:
     return changelog
 
 
+def _parse_issue_links(issuelinks) -> List[IssueLink]:
+    return [
+        IssueLink(key=l.inwardIssue.key, type=l.type.name, direction=LinkDirection.Inward)
+        if hasattr(l, 'inwardIssue') else
+        IssueLink(key=l.outwardIssue.key, type=l.type.name, direction=LinkDirection.Outward)
+        for l in issuelinks
+    ]
+
+
 def _diff_days(d1, d2) -> float:
     diff = d1 - d2
     diff = diff.days + diff.seconds / 3600.0 / 24.0
@@ -81,7 +96,7 @@ def _num_weekend_days(d1, d2, excluded=(6, 7)) -> int:
     return n
 
 
-def _parse_stats(changelog: List[Event]) -> Tuple[Dict, Dict]:
+def _parse_stats(changelog: List[Event], now: Optional[datetime.datetime] = None) -> Tuple[Dict, Dict]:
     s = collections.OrderedDict()
     a = collections.OrderedDict()
     if not changelog:
@@ -110,7 +125,7 @@ def _parse_stats(changelog: List[Event]) -> Tuple[Dict, Dict]:
             prev_assignee = e.assignee
             prev_assignee_created = e.created
 
-    now = datetime.datetime.now()
+    now = now or datetime.datetime.now()
     if prev_status_created:
         s[prev_status] += _diff_days(now, prev_status_created)
     if prev_assignee_created:
@@ -118,19 +133,63 @@ def _parse_stats(changelog: List[Event]) -> Tuple[Dict, Dict]:
     return s, a
 
 
-def parse_jira_issue(issue: Any) -> JiraIssue:
+def _parse_numeric(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # 'NaN' and 'inf' parse as floats but aren't meaningful field values
+    return number if math.isfinite(number) else None
+
+
+def _parse_date(value: Any) -> Optional[datetime.date]:
+    try:
+        return datetime.datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _parse_text(value: Any) -> str:
+    # option, user and cloud sprint values are objects, server sprints are serialized strings
+    for attr in ('name', 'value', 'displayName'):
+        if hasattr(value, attr):
+            return str(getattr(value, attr))
+    m = _SPRINT_NAME.search(value) if isinstance(value, str) else None
+    return m.group(1) if m else str(value)
+
+
+def _parse_custom_field(value: Any, field_type: CustomFieldType) -> Any:
+    if value is None:
+        return None
+    if field_type == CustomFieldType.Numeric:
+        return _parse_numeric(value)
+    elif field_type == CustomFieldType.Date:
+        return _parse_date(value)
+    else:
+        return [_parse_text(v) for v in (value if isinstance(value, list) else [value])]
+
+
+def parse_jira_issue(issue: Any, promoted_fields: Sequence[PromotedField] = ()) -> JiraIssue:
     log = _parse_issue_changelog(issue)
     time_in_status, time_per_assignee = _parse_stats(log)
+    return _make_jira_issue(issue, log, time_in_status, time_per_assignee, _parse_timeline(log), promoted_fields)
+
 
+def _make_jira_issue(issue: Any,
+                     log: List[Event],
+                     time_in_status: Dict[str, float],
+                     time_per_assignee: Dict[str, float],
+                     timeline: Dict[datetime.date, TimelineItem],
+                     promoted_fields: Sequence[PromotedField] = (),
+                     ) -> JiraIssue:
     f = issue.fields
+    link_edges = _parse_issue_links(f.issuelinks)
 
     return JiraIssue(
         labels=f.labels,
         type=f.issuetype.name,
-        links=[
-            (l.inwardIssue.key if hasattr(l, 'inwardIssue') else l.outwardIssue.key, l.type.name)
-            for l in f.issuelinks
-        ],
+        links=[(l.key, l.type) for l in link_edges],
+        link_edges=link_edges,
         due_date=f.duedate,
         project=f.project.key,
         reporter=f.reporter.displayName if f.reporter else '',
@@ -151,12 +210,16 @@ def parse_jira_issue(issue: Any) -> JiraIssue:
         event_log=log,
         time_in_status=time_in_status,
         time_per_assignee=time_per_assignee,
-        timeline=_parse_timeline(log),
+        timeline=timeline,
         custom_fields={
             k: [str(x) for x in v] if isinstance(v, list) else str(v)
             for k, v in issue.fields.__dict__.items()
             if k.startswith('customfield_') and v is not None
-        }
+        },
+        promoted_fields={
+            p.column: _parse_custom_field(getattr(f, p.field_id, None), p.type)
+            for p in promoted_fields
+        },
     )
 
 
@@ -1,7 +1,7 @@
 import datetime
 import enum
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Dict
+from typing import Any, List, Optional, Tuple, Dict
 
 
 class Field(enum.Enum):
@@ -11,6 +11,24 @@ class Field(enum.Enum):
     Resolution = 400
 
 
+class LinkDirection(enum.Enum):
+    Inward = 100  # issuelink.inwardIssue, e.g. "is blocked by"
+    Outward = 200  # issuelink.outwardIssue, e.g. "blocks"
+
+
+class CustomFieldType(enum.Enum):
+    Numeric = 'numeric'
+    Date = 'date'
+    TextArray = 'text[]'
+
+
+@dataclass
+class PromotedField:
+    column: str  # the issue column the custom field is promoted to, e.g. story_points
+    field_id: str  # e.g. customfield_10002
+    type: CustomFieldType
+
+
 @dataclass
 class Event:
     reporter: Optional[str]
@@ -23,6 +41,13 @@ class Event:
     resolution: Optional[str]
 
 
+@dataclass
+class IssueLink:
+    key: str  # the linked issue key
+    type: str  # issuelink.type.name
+    direction: LinkDirection
+
+
 @dataclass
 class TimelineItem:
     status: List[str]
@@ -51,8 +76,10 @@ class JiraIssue:
     description: Optional[str]  # issue.fields.description
     labels: List[str]  # issue.fields.labels
     links: List[Tuple[str, str]]  # issue.fields.issuelinks
+    link_edges: List[IssueLink]  # issue.fields.issuelinks
     components: List[str]  # issue.fields.components
     custom_fields: Dict[str, str]  # json
+    promoted_fields: Dict[str, Any]  # typed values of the promoted custom fields, by column
     # derived dimensions
     event_log: List[Event]  # computed
     time_in_status: Dict[str, float]  # computed
@@ -0,0 +1,222 @@
+import hmac
+import json
+import queue
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+from jira import Issue
+
+from jiras.common.postgres import PostgresException
+from jiras.etl.extract import JiraDataSource
+from jiras.etl.load import DataDestination
+from jiras.etl.transform import parse_jira_issue
+from jiras.etl.types import PromotedField
+
+_ISSUE_CREATED = 'jira:issue_created'
+_ISSUE_UPDATED = 'jira:issue_updated'
+_ISSUE_DELETED = 'jira:issue_deleted'
+_ISSUE_EVENTS = (_ISSUE_CREATED, _ISSUE_UPDATED, _ISSUE_DELETED)
+_ISSUE_KEY = re.compile(r'^[A-Z][A-Z0-9_]*-[0-9]+$')
+_SECRET_HEADER = 'X-Jiras-Webhook-Secret'
+
+
+def _has_changelog(raw_issue: Dict) -> bool:
+    changelog = raw_issue.get('changelog')
+    return isinstance(changelog, dict) and 'histories' in changelog
+
+
+class WebhookReceiver:
+    """
+    Upserts and deletes single issues from Jira issue webhook payloads.
+
+    Payloads are processed in micro-batches: a burst of events is collected for up to
+    batch_wait_seconds (or batch_size events) and only the last event per issue is applied.
+    With a source, the payloads are only taken as notifications: the issues are refetched
+    from it for the whole micro-batch (webhook payloads don't carry the changelog anyway),
+    restricted to jira_query when given, and the issues it doesn't return are deleted,
+    whatever the event. Without a source, e.g. when
+    replaying, the payloads are applied as they are. Resolved payloads can be recorded to
+    a file and replayed later without Jira.
+    """
+
+    def __init__(self, dest: DataDestination,
+                 source: Optional[JiraDataSource] = None,
+                 jira_query: Optional[str] = None,
+                 promoted_fields: Sequence[PromotedField] = (),
+                 batch_size: int = 100,
+                 batch_wait_seconds: float = 1.0,
+                 record_filepath: Optional[str] = None,
+                 ):
+        self.dest = dest
+        self.source = source
+        # the query of the warehouse source, issues that no longer match it are deleted
+        self.jira_query = jira_query
+        self.promoted_fields = promoted_fields
+        self.batch_size = batch_size
+        self.batch_wait_seconds = batch_wait_seconds
+        self.record_filepath = record_filepath
+        self._payloads: queue.Queue = queue.Queue()
+        self._stopped = threading.Event()
+
+    def submit(self, payload: Dict):
+        self._payloads.put(payload)
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        self.dest.postgres.connect()
+        try:
+            self.dest.create_source_partitions()
+            while not self._stopped.is_set():
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                try:
+                    self.process(batch)
+                except (Exception, PostgresException) as error:
+                    # keep receiving, the next events of these issues will bring them up to date
+                    print(f'Jiras webhook: failed to process {len(batch)} events - {error}')
+        finally:
+            self.dest.postgres.close()
+
+    def replay(self, filepath: str):
+        self.dest.postgres.connect()
+        try:
+            self.dest.create_source_partitions()
+            with open(filepath, 'rt', encoding='utf-8') as f:
+                batch = []
+                for n, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        batch.append(json.loads(line))
+                    except ValueError as error:
+                        print(f'Jiras webhook: skipping line {n} of {filepath} - {error}')
+                        continue
+                    if len(batch) == self.batch_size:
+                        self.process(batch)
+                        batch = []
+                if batch:
+                    self.process(batch)
+        finally:
+            self.dest.postgres.close()
+
+    def _next_batch(self) -> List[Dict]:
+        try:
+            batch = [self._payloads.get(timeout=self.batch_wait_seconds)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.batch_wait_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._payloads.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, payloads: List[Dict]):
+        # the last event of each issue wins, a bad payload only skips itself
+        latest: Dict[str, Dict] = {}
+        for p in payloads:
+            if not isinstance(p, dict) or p.get('webhookEvent') not in _ISSUE_EVENTS:
+                continue
+            issue = p.get('issue')
+            key = issue.get('key') if isinstance(issue, dict) else None
+            if not isinstance(key, str) or not _ISSUE_KEY.match(key):
+                print(f'Jiras webhook: skipping {p["webhookEvent"]} event without a valid issue key')
+                continue
+            latest[key] = p
+
+        if self.source is not None:
+            latest = self._refetch(latest)
+        deleted = [k for k, p in latest.items() if p['webhookEvent'] == _ISSUE_DELETED]
+        upserted = []
+        issues = []
+        for p in latest.values():
+            if p['webhookEvent'] == _ISSUE_DELETED:
+                continue
+            if not _has_changelog(p['issue']):
+                print(f'Jiras webhook: skipping {p["issue"]["key"]} without changelog')
+                continue
+            try:
+                issues.append(parse_jira_issue(Issue(options=None, session=None, raw=p['issue']), self.promoted_fields))
+            except Exception as error:
+                print(f'Jiras webhook: skipping {p["issue"]["key"]}, invalid issue - {error!r}')
+                continue
+            upserted.append(p)
+        self._record(upserted + [latest[k] for k in deleted])
+
+        self.dest.load(issues)
+        self.dest.delete(deleted)
+        print(f'Jiras webhook: upserted={len(upserted)}, deleted={len(deleted)}')
+
+    def _refetch(self, latest: Dict[str, Dict]) -> Dict[str, Dict]:
+        if not latest:
+            return latest
+        jql = f'key in ({",".join(latest)})'
+        if self.jira_query:
+            jql = f'({self.jira_query}) and {jql}'
+        # without validation jira ignores the keys that no longer exist (deleted or moved issues)
+        # instead of failing the whole query, they're told apart by the result
+        fetched = {
+            i.key: i.raw
+            for i in self.source.query(jql=jql, limit=len(latest), validate_query=False)
+        }
+        refetched = {}
+        for key, p in latest.items():
+            if key in fetched:
+                # an issue that still exists is upserted, whatever the event claims
+                event = _ISSUE_UPDATED if p['webhookEvent'] == _ISSUE_DELETED else p['webhookEvent']
+                refetched[key] = {**p, 'webhookEvent': event, 'issue': fetched[key]}
+            else:
+                # gone from jira, moved, or out of the source's query
+                refetched[key] = {'webhookEvent': _ISSUE_DELETED, 'issue': {'key': key}}
+        return refetched
+
+    def _record(self, payloads: List[Dict]):
+        if not self.record_filepath or not payloads:
+            return
+        with open(self.record_filepath, 'at', encoding='utf-8') as f:
+            for p in payloads:
+                f.write(json.dumps(p) + '\n')
+
+
+def _is_authorized(handler: BaseHTTPRequestHandler, secret: str) -> bool:
+    # jira can't set custom headers on every edition, so the secret can also be part of the registered url
+    query = parse_qs(urlparse(handler.path).query)
+    token = handler.headers.get(_SECRET_HEADER) or next(iter(query.get('secret', [])), '')
+    return hmac.compare_digest(token.encode('utf-8'), secret.encode('utf-8'))
+
+
+def make_webhook_server(receiver: WebhookReceiver, host: str, port: int, secret: str) -> ThreadingHTTPServer:
+    assert secret, 'A webhook secret is required'
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not _is_authorized(self, secret):
+                self.send_response(401)
+                self.end_headers()
+                return
+            try:
+                payload: Any = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            receiver.submit(payload)
+            self.send_response(202)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), _Handler)
@@ -1,10 +1,15 @@
+-- every table is partitioned by the jira source (see Settings.sources), so each source can be refreshed
+-- independently. Single source runs load into the _default partitions of the empty source, rows of a source
+-- without partitions are rejected.
+
 drop table if exists issue cascade;
 create table issue
 (
-    id            serial primary key,
+    id            serial,
     ingested_at   timestamp without time zone not null default current_timestamp,
+    source        varchar(64)                 not null default '',
 
-    key           varchar(16)                 not null unique not null,
+    key           varchar(16)                 not null,
     project       varchar(64)                 not null,
     type          varchar(64)                 not null,
     status        varchar(64)                 not null,
@@ -24,15 +29,33 @@ create table issue
     labels        varchar(64)[],
     components    varchar(64)[],
     links         jsonb,
-    custom_fields jsonb
-);
+    custom_fields jsonb,
+    search_vector tsvector,
+    primary key (source, key)
+) partition by list (source);
+create table issue_default partition of issue for values in ('');
+create index ix_issue_search_vector on issue using gin (search_vector);
+
+-- ranked full-text search over summary, description, labels and components, e.g. select * from search_issues('login timeout')
+drop function if exists search_issues(text, integer);
+create function search_issues(query text, max_results integer default 20)
+    returns table (source varchar, key varchar, summary varchar, status varchar, rank real)
+    language sql stable as
+$$
+select i.source, i.key, i.summary, i.status, ts_rank(i.search_vector, q) as rank
+from issue i, websearch_to_tsquery('english', query) q
+where i.search_vector @@ q
+order by rank desc
+limit max_results
+$$;
 
 drop table if exists event_log cascade;
 create table event_log
 (
-    id          bigserial primary key,
+    id          bigserial,
     ingested_at timestamp without time zone not null default current_timestamp,
-    issue_key   varchar(16) references issue (key),
+    source      varchar(64)                 not null default '',
+    issue_key   varchar(16),
     field       varchar(32)                 not null,
     reporter    varchar(64),
     reporter_id varchar(16),
@@ -40,40 +63,83 @@ create table event_log
     assignee_id varchar(16),
     created     timestamp without time zone,
     status      varchar(64),
-    resolution  varchar(64)
-);
-create index ix_event_log_issue_key on event_log (issue_key);
+    resolution  varchar(64),
+    primary key (source, id),
+    foreign key (source, issue_key) references issue (source, key)
+) partition by list (source);
+create table event_log_default partition of event_log for values in ('');
+create index ix_event_log_issue_key on event_log (source, issue_key);
 
 drop table if exists time_in_status cascade;
 create table time_in_status
 (
-    id          bigserial primary key,
+    id          bigserial,
     ingested_at timestamp without time zone not null default current_timestamp,
-    issue_key   varchar(16) references issue (key),
+    source      varchar(64)                 not null default '',
+    issue_key   varchar(16),
     status      varchar(64),
-    days        numeric
-);
-create index ix_time_in_status_issue_key on time_in_status (issue_key);
+    days        numeric,
+    primary key (source, id),
+    foreign key (source, issue_key) references issue (source, key)
+) partition by list (source);
+create table time_in_status_default partition of time_in_status for values in ('');
+create index ix_time_in_status_issue_key on time_in_status (source, issue_key);
 
 drop table if exists time_per_assignee cascade;
 create table time_per_assignee
 (
-    id          bigserial primary key,
+    id          bigserial,
     ingested_at timestamp without time zone not null default current_timestamp,
-    issue_key   varchar(16) references issue (key),
+    source      varchar(64)                 not null default '',
+    issue_key   varchar(16),
     assignee    varchar(64),
-    days        numeric
-);
-create index ix_time_per_assignee_issue_key on time_per_assignee (issue_key);
+    days        numeric,
+    primary key (source, id),
+    foreign key (source, issue_key) references issue (source, key)
+) partition by list (source);
+create table time_per_assignee_default partition of time_per_assignee for values in ('');
+create index ix_time_per_assignee_issue_key on time_per_assignee (source, issue_key);
 
 drop table if exists timeline cascade;
 create table timeline
 (
-    id          bigserial primary key,
+    id          bigserial,
     ingested_at timestamp without time zone not null default current_timestamp,
-    issue_key   varchar(16) references issue (key),
+    source      varchar(64)                 not null default '',
+    issue_key   varchar(16),
     d           date,
     status      varchar(64)[],
-    assignee    varchar(64)[]
-);
-create index ix_timeline_issue_key on timeline (issue_key);
+    assignee    varchar(64)[],
+    primary key (source, id),
+    foreign key (source, issue_key) references issue (source, key)
+) partition by list (source);
+create table timeline_default partition of timeline for values in ('');
+create index ix_timeline_issue_key on timeline (source, issue_key);
+
+drop table if exists issue_link cascade;
+create table issue_link
+(
+    id          bigserial,
+    ingested_at timestamp without time zone not null default current_timestamp,
+    source      varchar(64)                 not null default '',
+    issue_key   varchar(16)                 not null,
+    linked_key  varchar(16)                 not null,
+    type        varchar(64)                 not null,
+    direction   varchar(16)                 not null,
+    primary key (source, id),
+    foreign key (source, issue_key) references issue (source, key)
+) partition by list (source);
+create table issue_link_default partition of issue_link for values in ('');
+create index ix_issue_link_issue_key on issue_link (source, issue_key);
+create index ix_issue_link_linked_key on issue_link (source, linked_key);
+
+drop table if exists issue_dependency cascade;
+create table issue_dependency
+(
+    source      varchar(64) not null default '',
+    ancestor    varchar(16) not null,
+    descendant  varchar(16) not null,
+    primary key (source, ancestor, descendant)
+) partition by list (source);
+create table issue_dependency_default partition of issue_dependency for values in ('');
+create index ix_issue_dependency_descendant on issue_dependency (source, descendant);
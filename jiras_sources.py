@@ -0,0 +1,15 @@
+import sys
+
+from jiras import refresh_sources
+from jiras.common.settings import make_settings
+
+
+def main():
+    # refreshes all the configured sources, or only the ones named in the arguments
+    settings = make_settings('sources')
+    failed = refresh_sources(settings, names=sys.argv[1:])
+    assert not failed, f'Jiras sources failed: {", ".join(failed)}'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import sys
+import threading
+from typing import Optional
+
+from jiras import find_source, make_webhook_receiver
+from jiras.common.settings import Settings, make_settings
+from jiras.etl.extract import make_jira_client
+from jiras.etl.webhook import make_webhook_server
+
+_USAGE = 'Usage: jiras_webhook.py serve [jira-server-url] | replay <payloads-filepath>'
+
+
+def serve(jira_server: Optional[str]):
+    if Settings().webhook_source:
+        # the issues are refetched from the jira of the webhook source
+        settings = make_settings('webhook_secret', 'sources')
+        jira = make_jira_client(find_source(settings, settings.webhook_source))
+    else:
+        assert jira_server, _USAGE
+        settings = make_settings('jira_user', 'jira_pass', 'webhook_secret')
+        settings.jira_server = jira_server
+        jira = make_jira_client(settings)
+    receiver = make_webhook_receiver(settings, source=jira)
+    server = make_webhook_server(
+        receiver,
+        host=settings.webhook_host,
+        port=int(settings.webhook_port),
+        secret=settings.webhook_secret,
+    )
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f'Jiras webhook receiver listening on {settings.webhook_host}:{settings.webhook_port}')
+    try:
+        receiver.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def replay(filepath: str):
+    # replaying recorded payloads only needs the database settings
+    receiver = make_webhook_receiver(Settings())
+    receiver.replay(filepath)
+    print('Jiras webhook replay completed')
+
+
+def main():
+    assert len(sys.argv) in (2, 3) and sys.argv[1] in ('serve', 'replay'), _USAGE
+    if sys.argv[1] == 'serve':
+        serve(sys.argv[2] if len(sys.argv) == 3 else None)
+    else:
+        assert len(sys.argv) == 3, _USAGE
+        replay(sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()